@@ -1,11 +1,15 @@
 import json
 import os
+import re
 import uuid
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import google.generativeai as genai
 from datetime import datetime
+from journey_store import JourneyBundle, export_journeys, validate_journey_name
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -31,6 +35,19 @@ model = genai.GenerativeModel(
     generation_config={"temperature": 0.7, "top_p": 0.95, "top_k": 40}
 )
 
+# Speculative prefetch configuration
+SPECULATIVE_PREFETCH = os.environ.get('SPECULATIVE_PREFETCH', 'false').lower() == 'true'
+speculation_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('SPECULATION_WORKERS', 2)),
+    thread_name_prefix='speculation'
+) if SPECULATIVE_PREFETCH else None
+speculation_stats = {"launched": 0, "hits": 0, "misses": 0, "cancelled": 0}
+speculation_stats_lock = threading.Lock()
+
+# Journey bundle export configuration
+JOURNEY_BUNDLE_PATH = os.environ.get('JOURNEY_BUNDLE_PATH', 'journeys.bundle')
+journey_bundle_lock = threading.Lock()
+
 # Mock data for screen components
 def get_mock_screen_components():
     return [
@@ -490,16 +507,20 @@ def complete_journey_with_field_components(journey):
             source_screen = next((s for s in updated_journey.get("screens", []) if s.get("screen_id") == nav.get("source_screen_id")), None)
             if source_screen:
                 # Find a trigger component in the source screen
-                for component in source_screen.get("screen_components", []):
-                    for field in component.get("field_components", []):
-                        if field.get("fieldType") == "button":
-                            nav["trigger_component_id"] = field.get("fieldComponentId")
-                            break
-                    if nav.get("trigger_component_id"):
-                        break
+                trigger_component_id = find_trigger_component_id(source_screen)
+                if trigger_component_id:
+                    nav["trigger_component_id"] = trigger_component_id
     
     return updated_journey
 
+# Find the first button field on a screen to use as a navigation trigger
+def find_trigger_component_id(screen):
+    for component in screen.get("screen_components", []):
+        for field in component.get("field_components", []):
+            if field.get("fieldType") == "button":
+                return field.get("fieldComponentId")
+    return None
+
 # Determine conversation state based on journey completeness
 def determine_conversation_state(journey):
     # Check journey basics
@@ -522,6 +543,196 @@ def determine_conversation_state(journey):
     
     return "complete"
 
+# Build default linear navigation rules (screen n -> screen n+1)
+def build_default_navigation(journey):
+    screens = sorted(journey.get("screens", []), key=lambda s: s.get("screen_id", 0))
+    navigation = []
+    for source, target in zip(screens, screens[1:]):
+        navigation.append({
+            "source_screen_id": source.get("screen_id"),
+            "target_screen_id": target.get("screen_id"),
+            "navigation_type": "button_click",
+            "trigger_component_id": find_trigger_component_id(source)
+        })
+    return navigation
+
+# Escape text for use inside a quoted Mermaid node label
+def escape_mermaid_label(text):
+    text = str(text).replace("#", "#35;")
+    for char, entity in (('"', "#34;"), ("[", "#91;"), ("]", "#93;"), ("<", "#60;"), (">", "#62;")):
+        text = text.replace(char, entity)
+    return text
+
+# Draft a Mermaid flow diagram from the journey screens and navigation
+def build_flow_diagram(journey):
+    lines = ["flowchart TD"]
+    for screen in journey.get("screens", []):
+        components = []
+        for c in screen.get("screen_components", []):
+            if isinstance(c, dict):
+                components.append(c.get("screen_component_name") or f"component{c.get('screen_component_id')}")
+            else:
+                components.append(str(c))
+        label = escape_mermaid_label(screen.get("screen_name") or f"screen{screen.get('screen_id')}")
+        if components:
+            label = f"{label}<br/>{escape_mermaid_label(', '.join(components))}"
+        lines.append(f'    S{screen.get("screen_id")}["{label}"]')
+    for nav in journey.get("navigation", []):
+        lines.append(f'    S{nav.get("source_screen_id")} -->|{nav.get("navigation_type", "button_click")}| S{nav.get("target_screen_id")}')
+    return "\n".join(lines)
+
+# Structural fingerprint of a journey (screens, components and navigation edges)
+def journey_fingerprint(journey):
+    screens = []
+    for screen in journey.get("screens", []):
+        component_ids = [
+            c.get("screen_component_id") if isinstance(c, dict) else str(c).lower()
+            for c in screen.get("screen_components", [])
+        ]
+        screens.append([screen.get("screen_id"), screen.get("screen_name"), component_ids])
+    navigation = sorted(
+        [nav.get("source_screen_id"), nav.get("target_screen_id")]
+        for nav in journey.get("navigation", [])
+    )
+    return json.dumps([journey.get("journey_name"), screens, navigation], sort_keys=True, default=str)
+
+# Short replies that only accept the predicted next step; anything longer goes to Gemini
+FINALIZE_PHRASES = {
+    "finalize", "finalize it", "finalize the journey", "finalize journey",
+    "done", "im done", "complete", "finish", "confirm", "confirmed",
+    "looks good finalize", "looks good finalize it"
+}
+DEFAULT_NAVIGATION_PHRASES = {
+    "in order", "connect them in order", "connect the screens in order",
+    "sequential", "sequential navigation", "linear", "linear navigation",
+    "default", "default navigation", "use default navigation", "use the default navigation",
+    "one after another"
+}
+FILLER_WORDS = {"yes", "ok", "okay", "sure", "please", "thanks", "thank", "you"}
+
+# Check whether a message is nothing more than one of the given accept phrases
+def matches_intent_phrase(user_message, phrases):
+    words = re.sub(r"[^a-z0-9 ]", "", user_message.lower()).split()
+    # Ignore polite filler at either end, but nothing in between
+    while words and words[0] in FILLER_WORDS:
+        words.pop(0)
+    while words and words[-1] in FILLER_WORDS:
+        words.pop()
+    return " ".join(words) in phrases
+
+# Update speculation hit-rate counters
+def record_speculation(outcome):
+    with speculation_stats_lock:
+        speculation_stats[outcome] += 1
+
+# Precompute the answer to the next turn the conversation state makes likely
+def speculate_next_turn(journey):
+    state = determine_conversation_state(journey)
+    predicted_journey = complete_journey_with_field_components(journey)
+    
+    if state == "defining_navigation":
+        # The likely next step is accepting the default linear flow
+        predicted_journey["navigation"] = build_default_navigation(predicted_journey)
+        kind = "navigation"
+    elif state == "complete":
+        # The likely next step is finalization
+        kind = "finalize"
+    else:
+        return None
+    
+    return {
+        "kind": kind,
+        "journey": predicted_journey,
+        "validation_errors": validate_journey_completeness(predicted_journey),
+        "flow_diagram": build_flow_diagram(predicted_journey)
+    }
+
+# Launch speculation for the next turn in the background pool
+def start_speculation(session_data, journey):
+    # Only the navigation and finalization turns are predictable enough to precompute
+    if not SPECULATIVE_PREFETCH or determine_conversation_state(journey) not in ("defining_navigation", "complete"):
+        return
+    session_data['speculation'] = {
+        "future": speculation_pool.submit(speculate_next_turn, journey),
+        "fingerprint": journey_fingerprint(journey)
+    }
+    record_speculation("launched")
+
+# Take the pending speculation and return its artifacts if they answer this turn
+def claim_speculation(session_data, journey, user_message):
+    speculation = session_data.pop('speculation', None)
+    if not speculation:
+        return None
+    
+    future = speculation["future"]
+    if not future.done():
+        # The user replied before the speculation finished; don't wait on it
+        future.cancel()
+        record_speculation("cancelled")
+        return None
+    
+    try:
+        artifacts = future.result()
+    except Exception as e:
+        logger.warning(f"Speculation failed: {str(e)}")
+        artifacts = None
+    
+    matches = (
+        artifacts is not None
+        and speculation["fingerprint"] == journey_fingerprint(journey)
+        and not artifacts["validation_errors"]
+        and (
+            (artifacts["kind"] == "finalize" and matches_intent_phrase(user_message, FINALIZE_PHRASES))
+            or (artifacts["kind"] == "navigation" and matches_intent_phrase(user_message, DEFAULT_NAVIGATION_PHRASES))
+        )
+    )
+    record_speculation("hits" if matches else "misses")
+    return artifacts if matches else None
+
+# Build the response for a successfully finalized journey
+def finalized_response(session_data, session_id, journey, flow_diagram):
+    # Keep the finalized journey around for export
+    session_data['finalized_journey'] = journey
+    
+    # If we have a flow diagram, include it in the response
+    if flow_diagram:
+        finalize_message = f"Journey '{journey.get('journey_name', 'Unnamed')}' has been finalized.\n\nHere's a visualization of your journey flow:"
+        return jsonify({
+            "message": finalize_message,
+            "journey_state": "complete",
+            "session_id": session_id,
+            "journey_json": journey,
+            "flow_diagram": flow_diagram
+        }), 200
+    
+    # Journey is complete but no flow diagram
+    return jsonify({
+        "message": f"Journey '{journey.get('journey_name', 'Unnamed')}' has been finalized.",
+        "journey_state": "complete",
+        "session_id": session_id,
+        "journey_json": journey
+    }), 200
+
+# Answer a turn from speculated artifacts without calling Gemini
+def speculative_response(session_data, session_id, artifacts):
+    journey = artifacts["journey"]
+    session_data['journey'] = journey
+    
+    if artifacts["kind"] == "finalize":
+        session_data['chat_history'].append({"role": "assistant", "content": f"Journey '{journey.get('journey_name', 'Unnamed')}' has been finalized."})
+        return finalized_response(session_data, session_id, journey, artifacts["flow_diagram"])
+    
+    screen_names = " -> ".join(s.get("screen_name") or f"screen{s.get('screen_id')}" for s in journey.get("screens", []))
+    message = f"I've connected the screens in order: {screen_names}. Say 'finalize' when you're ready to complete the journey."
+    session_data['chat_history'].append({"role": "assistant", "content": message})
+    start_speculation(session_data, journey)
+    return jsonify({
+        "message": message,
+        "journey_state": determine_conversation_state(journey),
+        "session_id": session_id,
+        "journey_json": journey
+    }), 200
+
 # Main process endpoint
 @app.route('/process', methods=['POST'])
 def process_message():
@@ -547,6 +758,11 @@ def process_message():
     # Check for finalization request
     finalizing = should_finalize(user_message)
     
+    # Answer immediately if the speculated next turn matches the user's message
+    artifacts = claim_speculation(session_data, journey, user_message)
+    if artifacts:
+        return speculative_response(session_data, session_id, artifacts)
+    
     # Format the current journey context for Gemini
     component_details = "\n".join([f"{comp['id']}. {comp['name']}" for comp in get_mock_screen_components()])
     journey_context = f"""
@@ -625,6 +841,10 @@ def process_message():
         # Add AI response to chat history
         session_data['chat_history'].append({"role": "assistant", "content": cleaned_response})
         
+        # Precompute likely next artifacts while the user is typing
+        if not finalizing:
+            start_speculation(session_data, completed_journey)
+        
         # Check if we should finalize
         if finalizing:
             validation_errors = validate_journey_completeness(completed_journey)
@@ -637,24 +857,7 @@ def process_message():
                     "journey_json": completed_journey
                 }), 200
             else:
-                # If we have a flow diagram, include it in the response
-                if flow_diagram:
-                    finalize_message = f"Journey '{completed_journey.get('journey_name', 'Unnamed')}' has been finalized.\n\nHere's a visualization of your journey flow:"
-                    return jsonify({
-                        "message": finalize_message,
-                        "journey_state": "complete",
-                        "session_id": session_id,
-                        "journey_json": completed_journey,
-                        "flow_diagram": flow_diagram
-                    }), 200
-                else:
-                    # Journey is complete but no flow diagram
-                    return jsonify({
-                        "message": f"Journey '{completed_journey.get('journey_name', 'Unnamed')}' has been finalized.",
-                        "journey_state": "complete",
-                        "session_id": session_id,
-                        "journey_json": completed_journey
-                    }), 200
+                return finalized_response(session_data, session_id, completed_journey, flow_diagram)
         
         # Regular response during journey building
         return jsonify({
@@ -673,6 +876,86 @@ def process_message():
             "journey_json": journey  # Include journey JSON even on error
         }), 500
 
+# Route for speculative prefetch hit-rate stats
+@app.route('/speculation/stats', methods=['GET'])
+def get_speculation_stats():
+    with speculation_stats_lock:
+        stats = dict(speculation_stats)
+    resolved = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / resolved if resolved else 0.0
+    stats["enabled"] = SPECULATIVE_PREFETCH
+    return jsonify(stats), 200
+
+# Route to export finalized journeys into the bundle store
+@app.route('/export', methods=['POST'])
+def export_finalized_journeys():
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('session_id')
+    sessions = getattr(app, 'session_data', {})
+    
+    # Export one session's journey if requested, otherwise every finalized journey
+    if session_id:
+        if session_id not in sessions:
+            return jsonify({"error": "Invalid or expired session ID. Please start a new conversation."}), 400
+        journeys = [sessions[session_id].get('finalized_journey')]
+        if not journeys[0]:
+            return jsonify({"error": "Journey has not been finalized yet"}), 400
+    else:
+        journeys = [s['finalized_journey'] for s in sessions.values() if s.get('finalized_journey')]
+        if not journeys:
+            return jsonify({"error": "No finalized journeys to export"}), 400
+    
+    # Reject journeys the bundle cannot index before touching the store
+    for journey in journeys:
+        try:
+            validate_journey_name(journey.get("journey_name"))
+        except ValueError as e:
+            return jsonify({"error": f"Cannot export journey: {str(e)}"}), 400
+    
+    try:
+        with journey_bundle_lock:
+            exported, bundle_size = export_journeys(JOURNEY_BUNDLE_PATH, journeys)
+    except Exception as e:
+        logger.error(f"Error exporting journeys: {str(e)}")
+        return jsonify({"error": f"Failed to export journeys: {str(e)}"}), 500
+    
+    return jsonify({
+        "exported": exported,
+        "bundle_path": JOURNEY_BUNDLE_PATH,
+        "bundle_size": bundle_size
+    }), 200
+
+# Route to list journeys in the bundle store
+@app.route('/journeys', methods=['GET'])
+def list_journeys():
+    if not os.path.exists(JOURNEY_BUNDLE_PATH):
+        return jsonify({"journeys": []}), 200
+    
+    try:
+        with JourneyBundle(JOURNEY_BUNDLE_PATH) as bundle:
+            names = bundle.names()
+    except (ValueError, OSError) as e:
+        logger.error(f"Error reading journey bundle: {str(e)}")
+        return jsonify({"error": f"Failed to read journey bundle: {str(e)}"}), 500
+    
+    return jsonify({"journeys": names}), 200
+
+# Route to fetch a journey from the bundle store by name
+@app.route('/journeys/<journey_name>', methods=['GET'])
+def get_journey(journey_name):
+    journey = None
+    if os.path.exists(JOURNEY_BUNDLE_PATH):
+        try:
+            with JourneyBundle(JOURNEY_BUNDLE_PATH) as bundle:
+                journey = bundle.get(journey_name)
+        except (ValueError, OSError) as e:
+            logger.error(f"Error reading journey bundle: {str(e)}")
+            return jsonify({"error": f"Failed to read journey bundle: {str(e)}"}), 500
+    
+    if journey is None:
+        return jsonify({"error": f"Journey '{journey_name}' not found"}), 404
+    return jsonify({"journey_name": journey_name, "journey_json": journey}), 200
+
 # Main entry point
 def main():
     port = int(os.environ.get('PORT', 5001))
@@ -0,0 +1 @@
+# Makes the top-level app and journey_store modules importable from tests/
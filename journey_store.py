@@ -0,0 +1,512 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+# Bundle layout (little-endian):
+#   header
+#   string table:  (n_strings + 1) u32 offsets, then UTF-8 data
+#   field table:   (n_fields + 1) u32 offsets, then encoded field components
+#                  (without their per-occurrence timestamps)
+#   journey index: n_journeys x (name string id, offset, length), sorted by name
+#   journey data:  encoded journeys
+BUNDLE_MAGIC = b'JRNB'
+BUNDLE_VERSION = 2
+HEADER = struct.Struct('<4sHHIIIIII')
+INDEX_ENTRY = struct.Struct('<III')
+OFFSET = struct.Struct('<I')
+FLOAT = struct.Struct('<d')
+
+# Value tags
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_FLOAT = 4
+TAG_STRING = 5
+TAG_LIST = 6
+TAG_DICT = 7
+TAG_FIELD = 8
+
+# Field keys that change on every expansion and are stored per occurrence
+VOLATILE_FIELD_KEYS = ("createdAt", "updatedAt")
+
+# Write an unsigned LEB128 varint
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+# Read an unsigned LEB128 varint, returning (value, next position)
+def read_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+# Encoder that interns strings and field components across all journeys in a bundle
+class BundleEncoder:
+    def __init__(self):
+        self.strings = []
+        self.string_ids = {}
+        self.fields = []
+        self.field_ids = {}
+
+    def intern_string(self, value):
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = string_id
+        return string_id
+
+    # Field components are interned by their stable content (which includes fieldComponentId),
+    # so only fields that match apart from their timestamps are shared
+    def intern_field(self, field):
+        stable = {k: v for k, v in field.items() if k not in VOLATILE_FIELD_KEYS}
+        encoded = bytearray()
+        self.encode_dict(stable, encoded)
+        key = bytes(encoded)
+        field_id = self.field_ids.get(key)
+        if field_id is None:
+            field_id = len(self.fields)
+            self.fields.append(key)
+            self.field_ids[key] = field_id
+        return field_id
+
+    def encode_dict(self, value, out):
+        out.append(TAG_DICT)
+        write_varint(out, len(value))
+        for key, item in value.items():
+            write_varint(out, self.intern_string(str(key)))
+            self.encode_value(item, out)
+
+    def encode_value(self, value, out):
+        if value is None:
+            out.append(TAG_NONE)
+        elif value is True:
+            out.append(TAG_TRUE)
+        elif value is False:
+            out.append(TAG_FALSE)
+        elif isinstance(value, int):
+            out.append(TAG_INT)
+            write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)  # Zigzag
+        elif isinstance(value, float):
+            out.append(TAG_FLOAT)
+            out += FLOAT.pack(value)
+        elif isinstance(value, str):
+            out.append(TAG_STRING)
+            write_varint(out, self.intern_string(value))
+        elif isinstance(value, (list, tuple)):
+            out.append(TAG_LIST)
+            write_varint(out, len(value))
+            for item in value:
+                self.encode_value(item, out)
+        elif isinstance(value, dict):
+            if "fieldComponentId" in value:
+                out.append(TAG_FIELD)
+                write_varint(out, self.intern_field(value))
+                self.encode_dict({k: value[k] for k in VOLATILE_FIELD_KEYS if k in value}, out)
+            else:
+                self.encode_dict(value, out)
+        else:
+            raise TypeError(f"Cannot encode value of type {type(value).__name__}")
+
+# Journey names index the bundle, so they must be non-empty strings
+def validate_journey_name(name):
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Journey name must be a non-empty string, got {name!r}")
+
+# Write journeys (name -> journey) to a bundle file, replacing it atomically
+def write_bundle(path, journeys):
+    for name in journeys:
+        validate_journey_name(name)
+
+    encoder = BundleEncoder()
+    entries = []
+    journey_data = bytearray()
+    for name in sorted(journeys):
+        encoded = bytearray()
+        encoder.encode_value(journeys[name], encoded)
+        entries.append((encoder.intern_string(name), len(journey_data), len(encoded)))
+        journey_data += encoded
+
+    string_blobs = [s.encode('utf-8') for s in encoder.strings]
+
+    def build_table(blobs):
+        table = bytearray()
+        offset = 0
+        for blob in blobs:
+            table += OFFSET.pack(offset)
+            offset += len(blob)
+        table += OFFSET.pack(offset)
+        return table + b''.join(blobs)
+
+    string_table = build_table(string_blobs)
+    field_table = build_table(encoder.fields)
+
+    strings_off = HEADER.size
+    fields_off = strings_off + len(string_table)
+    index_off = fields_off + len(field_table)
+    data_off = index_off + INDEX_ENTRY.size * len(entries)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.journeys-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(
+                BUNDLE_MAGIC, BUNDLE_VERSION, 0,
+                len(encoder.strings), len(encoder.fields), len(entries),
+                strings_off, fields_off, index_off
+            ))
+            f.write(string_table)
+            f.write(field_table)
+            for name_id, offset, length in entries:
+                f.write(INDEX_ENTRY.pack(name_id, data_off + offset, length))
+            f.write(journey_data)
+        os.replace(tmp_path, path)
+    except:
+        os.unlink(tmp_path)
+        raise
+
+    return os.path.getsize(path)
+
+# Read-only, memory-mapped view of a journey bundle
+class JourneyBundle:
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except:
+            self._file.close()
+            raise
+
+        if len(self._mm) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a journey bundle")
+        (magic, version, _, self._n_strings, self._n_fields, self._n_journeys,
+         self._strings_off, self._fields_off, self._index_off) = HEADER.unpack_from(self._mm, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {BUNDLE_VERSION} journey bundle")
+
+        self._string_data_off = self._strings_off + OFFSET.size * (self._n_strings + 1)
+        self._field_data_off = self._fields_off + OFFSET.size * (self._n_fields + 1)
+        index_end = self._index_off + INDEX_ENTRY.size * self._n_journeys
+        if not (HEADER.size <= self._strings_off <= self._string_data_off <= self._fields_off
+                <= self._field_data_off <= self._index_off <= index_end <= len(self._mm)):
+            self.close()
+            raise ValueError(f"{path} is a truncated or corrupt journey bundle")
+        self._string_cache = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._n_journeys
+
+    def __contains__(self, name):
+        return self._find(name) is not None
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def _string(self, string_id):
+        value = self._string_cache.get(string_id)
+        if value is None:
+            pos = self._strings_off + OFFSET.size * string_id
+            start, = OFFSET.unpack_from(self._mm, pos)
+            end, = OFFSET.unpack_from(self._mm, pos + OFFSET.size)
+            value = self._mm[self._string_data_off + start:self._string_data_off + end].decode('utf-8')
+            self._string_cache[string_id] = value
+        return value
+
+    def _index_entry(self, i):
+        return INDEX_ENTRY.unpack_from(self._mm, self._index_off + INDEX_ENTRY.size * i)
+
+    # Binary search the sorted journey index
+    def _find(self, name):
+        lo, hi = 0, self._n_journeys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            name_id, offset, length = self._index_entry(mid)
+            mid_name = self._string(name_id)
+            if mid_name == name:
+                return offset
+            if mid_name < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def _decode(self, pos):
+        buf = self._mm
+        tag = buf[pos]
+        pos += 1
+        if tag == TAG_NONE:
+            return None, pos
+        if tag == TAG_FALSE:
+            return False, pos
+        if tag == TAG_TRUE:
+            return True, pos
+        if tag == TAG_INT:
+            value, pos = read_varint(buf, pos)
+            return (value >> 1) ^ -(value & 1), pos
+        if tag == TAG_FLOAT:
+            return FLOAT.unpack_from(buf, pos)[0], pos + FLOAT.size
+        if tag == TAG_STRING:
+            string_id, pos = read_varint(buf, pos)
+            return self._string(string_id), pos
+        if tag == TAG_LIST:
+            count, pos = read_varint(buf, pos)
+            items = []
+            for _ in range(count):
+                item, pos = self._decode(pos)
+                items.append(item)
+            return items, pos
+        if tag == TAG_DICT:
+            count, pos = read_varint(buf, pos)
+            value = {}
+            for _ in range(count):
+                key_id, pos = read_varint(buf, pos)
+                item, pos = self._decode(pos)
+                value[self._string(key_id)] = item
+            return value, pos
+        if tag == TAG_FIELD:
+            field_id, pos = read_varint(buf, pos)
+            start, = OFFSET.unpack_from(buf, self._fields_off + OFFSET.size * field_id)
+            field, _ = self._decode(self._field_data_off + start)
+            volatile, pos = self._decode(pos)
+            field.update(volatile)
+            return field, pos
+        raise ValueError(f"Corrupt journey bundle: unknown tag {tag} at offset {pos - 1}")
+
+    def names(self):
+        try:
+            return [self._string(self._index_entry(i)[0]) for i in range(self._n_journeys)]
+        except (IndexError, struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"Corrupt journey bundle: {e}") from e
+
+    def get(self, name):
+        try:
+            offset = self._find(name)
+            if offset is None:
+                return None
+            return self._decode(offset)[0]
+        except (IndexError, struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"Corrupt journey bundle: {e}") from e
+
+    def load_all(self):
+        return {name: self.get(name) for name in self.names()}
+
+# Merge journeys into the bundle at path, returning (exported names, bundle size)
+def export_journeys(path, journeys):
+    journeys = list(journeys)
+
+    # Validate every name before touching the existing bundle
+    exported = []
+    for journey in journeys:
+        name = journey.get("journey_name")
+        validate_journey_name(name)
+        exported.append(name)
+
+    merged = {}
+    if os.path.exists(path):
+        with JourneyBundle(path) as bundle:
+            merged = bundle.load_all()
+    for name, journey in zip(exported, journeys):
+        merged[name] = journey
+
+    return exported, write_bundle(path, merged)
+
+# Load journeys from JSON files holding a journey, a /process response or a list of either
+def load_journey_files(paths):
+    journeys = []
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        for item in data if isinstance(data, list) else [data]:
+            journey = item.get("journey_json", item) if isinstance(item, dict) else None
+            if not isinstance(journey, dict):
+                raise ValueError(f"{path} does not contain a journey")
+            journeys.append(journey)
+    return journeys
+
+# Peak RSS of this process in kilobytes
+def peak_rss_kb():
+    # ru_maxrss survives exec on Linux, so a child spawned by a large parent would
+    # report the parent's peak; VmHWM is reset for the new process image
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+
+    import resource
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+# Measure load time and peak RSS in a fresh interpreter (invoked by the bench command)
+def bench_load(mode, target, lookups):
+    start = time.perf_counter()
+    if mode in ('json', 'json-lookup'):
+        # JSON files are named after their journey, so a lookup opens just that file
+        names = sorted(filename[:-len('.json')] for filename in os.listdir(target))
+        if mode == 'json-lookup':
+            names = names[:lookups]
+        journeys = {}
+        for name in names:
+            with open(os.path.join(target, f"{name}.json")) as f:
+                journeys[name] = json.load(f)
+        count = len(journeys)
+    elif mode == 'bundle':
+        with JourneyBundle(target) as bundle:
+            journeys = bundle.load_all()
+        count = len(journeys)
+    elif mode == 'bundle-lookup':
+        with JourneyBundle(target) as bundle:
+            journeys = {name: bundle.get(name) for name in bundle.names()[:lookups]}
+        count = len(journeys)
+    else:
+        count = 0
+    elapsed = time.perf_counter() - start
+
+    max_rss = peak_rss_kb()
+    print(json.dumps({"count": count, "seconds": elapsed, "max_rss_kb": max_rss}))
+
+# Strip expanded field components so the template can be expanded again with fresh timestamps
+def strip_field_components(journey):
+    template = json.loads(json.dumps(journey))  # Deep copy
+    for screen in template.get("screens", []):
+        for component in screen.get("screen_components", []):
+            if isinstance(component, dict):
+                component.pop("field_components", None)
+    return template
+
+def run_bench(paths, count, lookups):
+    # Expand journeys the way the app does, so timestamps differ per journey
+    from app import complete_journey_with_field_components
+
+    templates = [strip_field_components(journey) for journey in load_journey_files(paths)]
+    if not templates:
+        raise ValueError("No journeys to benchmark")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        json_dir = os.path.join(workdir, 'json')
+        os.makedirs(json_dir)
+        journeys = {}
+        for i in range(count):
+            journey = complete_journey_with_field_components(templates[i % len(templates)])
+            journey["journey_name"] = f"{journey.get('journey_name') or 'Journey'}_{i}"
+            journeys[journey["journey_name"]] = journey
+            with open(os.path.join(json_dir, f"{journey['journey_name']}.json"), 'w') as f:
+                json.dump(journey, f, indent=2)
+
+        bundle_path = os.path.join(workdir, 'journeys.bundle')
+        bundle_size = write_bundle(bundle_path, journeys)
+        json_size = sum(os.path.getsize(os.path.join(json_dir, name)) for name in os.listdir(json_dir))
+
+        modes = (
+            ('baseline', ''),
+            ('json', json_dir), ('bundle', bundle_path),
+            ('json-lookup', json_dir), ('bundle-lookup', bundle_path)
+        )
+        results = {}
+        for mode, target in modes:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '_bench-load', mode, target, '--lookups', str(lookups)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results[mode] = json.loads(output)
+
+    baseline_rss = results['baseline']['max_rss_kb']
+    print(f"journeys:            {count}")
+    print(f"json size:           {json_size} bytes")
+    print(f"bundle size:         {bundle_size} bytes ({bundle_size / json_size:.1%} of json)")
+    labels = (
+        ('json', 'json load all'), ('bundle', 'bundle load all'),
+        ('json-lookup', 'json lookups'), ('bundle-lookup', 'bundle lookups')
+    )
+    for mode, label in labels:
+        result = results[mode]
+        print(f"{label + ':':<21}{result['count']} journeys, {result['seconds'] * 1000:.2f} ms, "
+              f"+{result['max_rss_kb'] - baseline_rss} KB RSS")
+
+# Dispatch a parsed CLI command, returning the process exit code
+def run_command(args):
+    if args.command == 'export':
+        exported, size = export_journeys(args.bundle, load_journey_files(args.files))
+        print(f"Exported {len(exported)} journey(s) to {args.bundle} ({size} bytes)")
+    elif args.command == 'list':
+        with JourneyBundle(args.bundle) as bundle:
+            for name in bundle.names():
+                print(name)
+    elif args.command == 'get':
+        with JourneyBundle(args.bundle) as bundle:
+            journey = bundle.get(args.name)
+        if journey is None:
+            print(f"Journey '{args.name}' not found in {args.bundle}", file=sys.stderr)
+            return 1
+        print(json.dumps(journey, indent=2))
+    elif args.command == 'bench':
+        run_bench(args.files, args.count, args.lookups)
+    elif args.command == '_bench-load':
+        bench_load(args.mode, args.target, args.lookups)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and inspect finalized journey bundles")
+    parser.add_argument('--bundle', default=os.environ.get('JOURNEY_BUNDLE_PATH', 'journeys.bundle'),
+                        help="Bundle file path (default: $JOURNEY_BUNDLE_PATH or journeys.bundle)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help="Export journeys from JSON files into the bundle")
+    export_parser.add_argument('files', nargs='+')
+
+    commands.add_parser('list', help="List journey names in the bundle")
+
+    get_parser = commands.add_parser('get', help="Print a journey from the bundle as JSON")
+    get_parser.add_argument('name')
+
+    bench_parser = commands.add_parser('bench', help="Compare bundle and plain JSON load time and RSS")
+    bench_parser.add_argument('files', nargs='+')
+    bench_parser.add_argument('--count', type=int, default=500)
+    bench_parser.add_argument('--lookups', type=int, default=10, help="Journeys fetched by name in the lookup runs")
+
+    bench_load_parser = commands.add_parser('_bench-load')
+    bench_load_parser.add_argument('mode', choices=['baseline', 'json', 'bundle', 'json-lookup', 'bundle-lookup'])
+    bench_load_parser.add_argument('target')
+    bench_load_parser.add_argument('--lookups', type=int, default=10)
+
+    args = parser.parse_args(argv)
+
+    try:
+        return run_command(args)
+    except (ValueError, OSError) as e:
+        # FileNotFoundError is an OSError; JSONDecodeError is a ValueError
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
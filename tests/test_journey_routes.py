@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+import app as journey_app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(journey_app, "JOURNEY_BUNDLE_PATH", str(tmp_path / "journeys.bundle"))
+    monkeypatch.setattr(journey_app.app, "session_data", {}, raising=False)
+    journey_app.app.config["TESTING"] = True
+    return journey_app.app.test_client()
+
+
+def finalize_session(session_id, journey):
+    journey_app.app.session_data[session_id] = {"journey": journey, "chat_history": [], "finalized_journey": journey}
+
+
+def test_export_list_and_fetch(client):
+    finalize_session("s1", {"journey_name": "LoanJourney", "screens": [], "navigation": []})
+
+    response = client.post("/export", json={"session_id": "s1"})
+    assert response.status_code == 200
+    assert response.get_json()["exported"] == ["LoanJourney"]
+
+    assert client.get("/journeys").get_json() == {"journeys": ["LoanJourney"]}
+    assert client.get("/journeys/LoanJourney").get_json()["journey_json"]["journey_name"] == "LoanJourney"
+    assert client.get("/journeys/Missing").status_code == 404
+
+
+def test_export_rejects_non_string_journey_name(client):
+    finalize_session("s1", {"journey_name": 42, "screens": []})
+
+    response = client.post("/export", json={"session_id": "s1"})
+
+    assert response.status_code == 400
+    assert "non-empty string" in response.get_json()["error"]
+    assert not os.path.exists(journey_app.JOURNEY_BUNDLE_PATH)
+
+
+def test_corrupt_bundle_returns_error(client):
+    with open(journey_app.JOURNEY_BUNDLE_PATH, "wb"):
+        pass
+
+    for url in ("/journeys", "/journeys/LoanJourney"):
+        response = client.get(url)
+        assert response.status_code == 500
+        assert "Failed to read journey bundle" in response.get_json()["error"]
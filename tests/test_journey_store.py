@@ -0,0 +1,209 @@
+import json
+
+import pytest
+
+from journey_store import JourneyBundle, export_journeys, write_bundle
+
+
+def field(field_id, label):
+    return {
+        "fieldComponentId": field_id, "fieldType": "button", "fieldName": f"btn{field_id}",
+        "fieldLabel": label, "validations": {}, "dataSource": None,
+        "isTriggerComponent": True, "style": "defaultFieldStyle",
+    }
+
+
+def journey(name, fields):
+    return {
+        "journey_name": name,
+        "no_screens": 1,
+        "screens": [{
+            "screen_id": 1,
+            "screen_name": "screen1",
+            "screen_components": [{"screen_component_id": 3, "field_components": fields}],
+        }],
+        "navigation": [],
+    }
+
+
+def roundtrip(tmp_path, journeys):
+    path = tmp_path / "journeys.bundle"
+    write_bundle(path, journeys)
+    with JourneyBundle(path) as bundle:
+        return bundle.load_all()
+
+
+def test_roundtrip_all_value_types(tmp_path):
+    value = {
+        "journey_name": "Types",
+        "none": None, "true": True, "false": False,
+        "ints": [0, 1, -1, 63, -64, 127, 128, -129, 2 ** 31, -(2 ** 31) - 1, 2 ** 70, -(2 ** 70)],
+        "floats": [0.0, -1.5, 3.141592653589793, 1e300],
+        "unicode": ["", "héllo", "日本語", "emoji 🚀", 'quote " and \\ backslash'],
+        "nested": {"list": [[], {}, [{"a": [1, {"b": None}]}]]},
+    }
+    assert roundtrip(tmp_path, {"Types": value}) == {"Types": value}
+
+
+def test_tuple_decodes_as_list(tmp_path):
+    assert roundtrip(tmp_path, {"T": {"pair": (1, "x")}})["T"] == {"pair": [1, "x"]}
+
+
+def test_field_components_with_colliding_ids_keep_their_content(tmp_path):
+    journeys = {
+        "A": journey("A", [field(10, "Next")]),
+        "B": journey("B", [field(10, "Submit application")]),
+    }
+    assert roundtrip(tmp_path, journeys) == journeys
+
+
+def test_identical_field_components_are_stored_once(tmp_path):
+    path = tmp_path / "journeys.bundle"
+    shared = field(10, "Next")
+    write_bundle(path, {name: journey(name, [shared, shared]) for name in ("A", "B", "C")})
+    with JourneyBundle(path) as bundle:
+        assert bundle._n_fields == 1
+        assert bundle.get("C") == journey("C", [shared, shared])
+
+
+def test_lookup_by_name(tmp_path):
+    path = tmp_path / "journeys.bundle"
+    journeys = {name: journey(name, [field(1, name)]) for name in ("Loan", "Card", "Savings", "Ünicode")}
+    write_bundle(path, journeys)
+    with JourneyBundle(path) as bundle:
+        assert bundle.names() == sorted(journeys)
+        assert len(bundle) == 4
+        assert bundle.get("Savings") == journeys["Savings"]
+        assert bundle.get("Ünicode") == journeys["Ünicode"]
+        assert bundle.get("Missing") is None
+        assert "Card" in bundle
+        assert "Missing" not in bundle
+
+
+def test_empty_bundle(tmp_path):
+    assert roundtrip(tmp_path, {}) == {}
+
+
+def test_export_merges_and_replaces_by_name(tmp_path):
+    path = tmp_path / "journeys.bundle"
+    export_journeys(path, [journey("A", [field(1, "old")]), journey("B", [field(2, "b")])])
+    exported, size = export_journeys(path, [journey("A", [field(1, "new")]), journey("C", [field(3, "c")])])
+
+    assert exported == ["A", "C"]
+    assert size == path.stat().st_size
+    with JourneyBundle(path) as bundle:
+        assert bundle.names() == ["A", "B", "C"]
+        assert bundle.get("A") == journey("A", [field(1, "new")])
+        assert bundle.get("B") == journey("B", [field(2, "b")])
+
+
+@pytest.mark.parametrize("name", [None, "", 42, ["A"]])
+def test_export_rejects_invalid_names(tmp_path, name):
+    path = tmp_path / "journeys.bundle"
+    export_journeys(path, [journey("A", [])])
+    before = path.read_bytes()
+
+    with pytest.raises(ValueError):
+        export_journeys(path, [journey("B", []), dict(journey("C", []), journey_name=name)])
+
+    assert path.read_bytes() == before
+
+
+def test_write_rejects_mixed_name_types(tmp_path):
+    with pytest.raises(ValueError):
+        write_bundle(tmp_path / "journeys.bundle", {"A": {}, 1: {}})
+
+
+def test_empty_file_is_rejected(tmp_path):
+    path = tmp_path / "journeys.bundle"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        JourneyBundle(path)
+
+
+def test_truncated_bundle_is_rejected(tmp_path):
+    path = tmp_path / "journeys.bundle"
+    write_bundle(path, {"A": journey("A", [field(1, "x")])})
+    data = path.read_bytes()
+
+    for size in (4, len(data) // 2):
+        path.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            with JourneyBundle(path) as bundle:
+                bundle.load_all()
+
+
+def test_not_a_bundle_is_rejected(tmp_path):
+    path = tmp_path / "journeys.json"
+    path.write_text(json.dumps({"journey_name": "A"}) * 10)
+    with pytest.raises(ValueError):
+        JourneyBundle(path)
+
+
+def test_expanded_journeys_share_fields_across_timestamps(tmp_path):
+    journey_app = pytest.importorskip("app")
+    journeys = {}
+    for i in range(50):
+        name = f"Journey{i}"
+        journeys[name] = journey_app.complete_journey_with_field_components({
+            "journey_name": name,
+            "no_screens": 4,
+            "screens": [
+                {"screen_id": k + 1, "screen_name": f"screen{k + 1}", "screen_components": [component]}
+                for k, component in enumerate(["CustomerDetails", "PAN", "OTP", "Calendar"])
+            ],
+            "navigation": [],
+        })
+
+    timestamps = {
+        field["createdAt"]
+        for journey in journeys.values()
+        for screen in journey["screens"]
+        for component in screen["screen_components"]
+        for field in component["field_components"]
+    }
+    assert len(timestamps) > 1
+
+    path = tmp_path / "journeys.bundle"
+    write_bundle(path, journeys)
+
+    with JourneyBundle(path) as bundle:
+        # 4 components x 3 fields, shared by all 50 journeys
+        assert bundle._n_fields == 12
+        assert bundle.load_all() == journeys
+
+
+@pytest.mark.parametrize("command", [["list"], ["get", "A"]])
+def test_cli_reports_missing_bundle(tmp_path, capsys, command):
+    from journey_store import main
+
+    assert main(["--bundle", str(tmp_path / "missing.bundle")] + command) == 1
+    assert "Error:" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("content", [None, "not json", "[1, 2]", '{"journey_json": "oops"}'])
+def test_cli_export_reports_bad_input(tmp_path, capsys, content):
+    from journey_store import main
+
+    input_path = tmp_path / "journey.json"
+    if content is not None:
+        input_path.write_text(content)
+
+    assert main(["--bundle", str(tmp_path / "journeys.bundle"), "export", str(input_path)]) == 1
+    assert "Error:" in capsys.readouterr().err
+    assert not (tmp_path / "journeys.bundle").exists()
+
+
+def test_cli_export_list_get(tmp_path, capsys):
+    from journey_store import main
+
+    bundle = str(tmp_path / "journeys.bundle")
+    input_path = tmp_path / "journey.json"
+    input_path.write_text(json.dumps({"message": "done", "journey_json": journey("A", [field(1, "x")])}))
+
+    assert main(["--bundle", bundle, "export", str(input_path)]) == 0
+    assert main(["--bundle", bundle, "list"]) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == "A"
+    assert main(["--bundle", bundle, "get", "A"]) == 0
+    assert json.loads(capsys.readouterr().out) == journey("A", [field(1, "x")])
+    assert main(["--bundle", bundle, "get", "B"]) == 1
@@ -0,0 +1,204 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app as journey_app
+
+
+class FakeModel:
+    def __init__(self, text="Sure.", error=None):
+        self.text = text
+        self.error = error
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return type("Response", (), {"text": self.text})()
+
+
+def make_journey(navigation=True):
+    journey = {
+        "journey_name": "SavingAccountJourney",
+        "journey_type": "single",
+        "no_screens": 2,
+        "screens": [
+            {"screen_id": 1, "screen_name": "screenhello", "screen_components": ["PAN"]},
+            {"screen_id": 2, "screen_name": "screenworld", "screen_components": ["OTP"]},
+        ],
+        "navigation": [],
+    }
+    journey = journey_app.complete_journey_with_field_components(journey)
+    if navigation:
+        journey["navigation"] = journey_app.build_default_navigation(journey)
+    return journey
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(journey_app, "SPECULATIVE_PREFETCH", True)
+    monkeypatch.setattr(journey_app, "speculation_pool", executor)
+    monkeypatch.setattr(journey_app, "speculation_stats", {"launched": 0, "hits": 0, "misses": 0, "cancelled": 0})
+    yield executor
+    executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def client():
+    journey_app.app.config["TESTING"] = True
+    return journey_app.app.test_client()
+
+
+def start_session(monkeypatch, journey, speculate=True):
+    session_id = "test-session"
+    session_data = {"journey": journey, "conversation_state": "complete", "chat_history": []}
+    monkeypatch.setattr(journey_app.app, "session_data", {session_id: session_data}, raising=False)
+    if speculate:
+        journey_app.start_speculation(session_data, journey)
+        session_data["speculation"]["future"].result(timeout=5)
+    return session_id, session_data
+
+
+def test_build_default_navigation_links_screens_in_order():
+    navigation = journey_app.build_default_navigation(make_journey(navigation=False))
+    assert navigation == [{
+        "source_screen_id": 1,
+        "target_screen_id": 2,
+        "navigation_type": "button_click",
+        "trigger_component_id": 13,  # validatePanBtn on the PAN screen
+    }]
+
+
+def test_journey_fingerprint_ignores_field_details_but_tracks_structure():
+    journey = make_journey()
+    same = make_journey()
+    same["screens"][0]["screen_components"][0]["field_components"] = []
+    assert journey_app.journey_fingerprint(journey) == journey_app.journey_fingerprint(same)
+
+    rerouted = make_journey()
+    rerouted["navigation"][0]["target_screen_id"] = 1
+    assert journey_app.journey_fingerprint(journey) != journey_app.journey_fingerprint(rerouted)
+
+
+def test_build_flow_diagram_escapes_labels_and_falls_back_to_component_id():
+    journey = make_journey()
+    journey["screens"][0]["screen_name"] = 'Say "hi" [now]'
+    del journey["screens"][1]["screen_components"][0]["screen_component_name"]
+
+    diagram = journey_app.build_flow_diagram(journey)
+
+    assert 'S1["Say #34;hi#34; #91;now#93;<br/>PAN"]' in diagram
+    assert 'S2["screenworld<br/>component9"]' in diagram
+    assert "fieldComponentId" not in diagram
+
+
+def test_finalize_hit_skips_model(monkeypatch, pool, client):
+    model = FakeModel()
+    monkeypatch.setattr(journey_app, "model", model)
+    session_id, session_data = start_session(monkeypatch, make_journey())
+
+    response = client.post("/process", json={"session_id": session_id, "message": "finalize"})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert model.calls == 0
+    assert body["journey_state"] == "complete"
+    assert body["flow_diagram"].startswith("flowchart TD")
+    assert session_data["finalized_journey"]["journey_name"] == "SavingAccountJourney"
+    assert journey_app.speculation_stats == {"launched": 1, "hits": 1, "misses": 0, "cancelled": 0}
+
+
+def test_default_navigation_hit_skips_model(monkeypatch, pool, client):
+    model = FakeModel()
+    monkeypatch.setattr(journey_app, "model", model)
+    session_id, session_data = start_session(monkeypatch, make_journey(navigation=False))
+
+    response = client.post("/process", json={"session_id": session_id, "message": "Connect them in order please"})
+
+    body = response.get_json()
+    assert model.calls == 0
+    assert body["journey_state"] == "complete"
+    assert body["journey_json"]["navigation"][0]["trigger_component_id"] == 13
+    assert journey_app.speculation_stats["hits"] == 1
+    # The finalization turn is speculated next
+    assert "speculation" in session_data
+
+
+def test_diverging_message_is_a_miss(monkeypatch, pool, client):
+    model = FakeModel()
+    monkeypatch.setattr(journey_app, "model", model)
+    session_id, session_data = start_session(monkeypatch, make_journey())
+
+    client.post("/process", json={"session_id": session_id, "message": "Rename the first screen"})
+
+    assert model.calls == 1
+    assert journey_app.speculation_stats["hits"] == 0
+    assert journey_app.speculation_stats["misses"] == 1
+
+
+def test_unfinished_speculation_is_cancelled(monkeypatch, pool, client):
+    release = threading.Event()
+    monkeypatch.setattr(journey_app, "speculate_next_turn", lambda journey: release.wait(5))
+    model = FakeModel()
+    monkeypatch.setattr(journey_app, "model", model)
+    session_id, session_data = start_session(monkeypatch, make_journey(), speculate=False)
+    journey_app.start_speculation(session_data, session_data["journey"])
+
+    client.post("/process", json={"session_id": session_id, "message": "finalize"})
+    release.set()
+
+    assert model.calls == 1
+    assert journey_app.speculation_stats["cancelled"] == 1
+    assert journey_app.speculation_stats["hits"] == 0
+
+
+def test_model_error_drops_pending_speculation(monkeypatch, pool, client):
+    monkeypatch.setattr(journey_app, "model", FakeModel(error=RuntimeError("boom")))
+    session_id, session_data = start_session(monkeypatch, make_journey())
+
+    response = client.post("/process", json={"session_id": session_id, "message": "Rename the first screen"})
+
+    assert response.status_code == 500
+    assert "speculation" not in session_data
+
+
+@pytest.mark.parametrize("message", [
+    "Looks done, but first add a Calendar screen as screen 3",
+    "Finalize after renaming screen 1 to welcome",
+    "Don't finalize yet",
+])
+def test_finalize_with_edits_is_a_miss(monkeypatch, pool, client, message):
+    model = FakeModel()
+    monkeypatch.setattr(journey_app, "model", model)
+    session_id, session_data = start_session(monkeypatch, make_journey())
+
+    client.post("/process", json={"session_id": session_id, "message": message})
+
+    assert model.calls == 1
+    assert journey_app.speculation_stats["hits"] == 0
+    assert journey_app.speculation_stats["misses"] == 1
+
+
+@pytest.mark.parametrize("message", [
+    "Not linear please: screen 2 should go back to screen 1",
+    "Not in order",
+    "Use default navigation but add a back button",
+])
+def test_negated_or_extended_navigation_is_a_miss(monkeypatch, pool, client, message):
+    model = FakeModel()
+    monkeypatch.setattr(journey_app, "model", model)
+    session_id, session_data = start_session(monkeypatch, make_journey(navigation=False))
+
+    client.post("/process", json={"session_id": session_id, "message": message})
+
+    assert model.calls == 1
+    assert journey_app.speculation_stats["hits"] == 0
+    assert journey_app.speculation_stats["misses"] == 1
+
+
+@pytest.mark.parametrize("message", ["Finalize", "Yes, finalize it please!", "OK done.", "confirm"])
+def test_short_finalize_phrases_match(message):
+    assert journey_app.matches_intent_phrase(message, journey_app.FINALIZE_PHRASES)